@@ -8,24 +8,25 @@ import sys
 import subprocess
 import os
 import platform
+import importlib.util
+import shutil
 import tkinter as tk
 from tkinter import messagebox
 
-# Required packages
-REQUIRED_PACKAGES = [
-    "python-chess",  # Chess library
-    "cairosvg",      # SVG to PNG conversion
-    "pillow",        # Image handling
-]
+# Required packages, mapped to the module each one installs
+REQUIRED_PACKAGES = {
+    "python-chess": "chess",  # Chess library
+    "cairosvg": "cairosvg",   # SVG to PNG conversion
+    "pillow": "PIL",          # Image handling
+}
 
 def check_dependencies():
     """Check if all required packages are installed."""
     missing_packages = []
     
-    for package in REQUIRED_PACKAGES:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
+    for package, module in REQUIRED_PACKAGES.items():
+        # Only locate the module; importing it would run its start-up code
+        if importlib.util.find_spec(module) is None:
             missing_packages.append(package)
     
     return missing_packages
@@ -40,6 +41,11 @@ def install_dependencies(packages):
 
 def check_engine():
     """Check if Stockfish is installed and accessible."""
+    # A Stockfish on the PATH covers most installs in one lookup
+    path = shutil.which("stockfish")
+    if path:
+        return True, path
+    
     # Common Stockfish paths by OS
     if platform.system() == "Windows":
         paths = [
@@ -5,9 +5,33 @@ Contains the core logic for analyzing processes and thought patterns
 """
 
 import chess
+import chess.engine
 import chess.pgn
 import io
 
+# Number of principal variations reported by get_engine_analysis
+TOP_MOVES = 3
+
+def _line(info):
+    """
+    Convert an engine info dict into a top-move entry
+    
+    Args:
+        info (dict): Info from chess.engine with a score and pv
+        
+    Returns:
+        dict: Move, evaluation in pawns from White's side and continuation,
+            or None when the info has no principal variation
+    """
+    pv = info.get("pv")
+    if not pv or "score" not in info:
+        return None
+    return {
+        "move": pv[0].uci(),
+        "eval": info["score"].white().score(mate_score=100000) / 100,
+        "lines": [move.uci() for move in pv[1:]]
+    }
+
 class ProcessAnalyzer:
     """
     Class responsible for analyzing processes and providing insights
@@ -17,31 +41,37 @@ class ProcessAnalyzer:
     by the user with custom logic.
     """
     
-    def __init__(self):
-        """Initialize the analyzer with default settings"""
+    def __init__(self, engine_pool=None):
+        """
+        Initialize the analyzer with default settings
+        
+        Args:
+            engine_pool (EnginePool): Running engines to search with (optional)
+        """
         # PLACEHOLDER: Initialize any required resources here
-        self.engine = None
-        pass
+        self.engine_pool = engine_pool
     
-    def analyze_position(self, fen, move=None):
+    def analyze_position(self, board, move=None, fen=None):
         """
         Analyze a position and optionally a move in that position.
         Returns structured analysis of the thought process.
         
         Args:
-            fen (str): FEN notation of the position
-            move (str): Move in algebraic notation (optional)
+            board (chess.Board): The position
+            move (chess.Move): Legal move in the position (optional)
+            fen (str): FEN to report for the position, as the client sent it;
+                board.fen() can differ, e.g. by dropping an en passant
+                square with no legal capture (defaults to board.fen())
             
         Returns:
             dict: Analysis results including thought process breakdown
         """
         # PLACEHOLDER: Implement your custom analysis logic here
-        board = chess.Board(fen)
         
         # Sample placeholder return structure
         return {
             "position": {
-                "fen": fen,
+                "fen": fen or board.fen(),
                 "legal_moves": [move.uci() for move in board.legal_moves],
                 "is_check": board.is_check(),
                 "is_checkmate": board.is_checkmate(),
@@ -55,27 +85,28 @@ class ProcessAnalyzer:
                 "plans": ["This is a placeholder for potential plans"]
             },
             "move_analysis": {
-                "move": move,
+                "move": board.san(move) if move else None,
                 "strength": "This is a placeholder for move strength",
                 "better_alternatives": ["This is a placeholder for better moves"],
                 "continuation": ["This is a placeholder for best continuation"]
             }
         }
     
-    def get_engine_analysis(self, fen, depth=20):
+    def get_engine_analysis(self, board, depth=20):
         """
         Get engine analysis for a position
         
         Args:
-            fen (str): FEN notation of the position
+            board (chess.Board): The position
             depth (int): Analysis depth
             
         Returns:
             dict: Engine analysis results
         """
-        # PLACEHOLDER: Implement your custom engine analysis logic here
-        board = chess.Board(fen)
+        if self.engine_pool:
+            return self._search(board, depth)
         
+        # PLACEHOLDER: Implement your custom engine analysis logic here
         # Sample placeholder return structure
         return {
             "best_move": "e2e4",  # Placeholder
@@ -92,10 +123,63 @@ class ProcessAnalyzer:
             }
         }
     
-    def parse_pgn(self, pgn_text):
+    def _search(self, board, depth):
+        """
+        Search a position with a pooled engine
+        
+        Args:
+            board (chess.Board): Position to search
+            depth (int): Analysis depth
+            
+        Returns:
+            dict: Engine analysis results, evaluations in pawns from White's side
+        """
+        with self.engine_pool.engine() as engine:
+            infos = engine.analyse(board, chess.engine.Limit(depth=depth), multipv=TOP_MOVES)
+        
+        top_moves = [line for line in map(_line, infos) if line]
+        
+        return {
+            "best_move": top_moves[0]["move"] if top_moves else None,
+            "evaluation": top_moves[0]["eval"] if top_moves else 0.0,
+            "depth": depth,
+            "top_moves": top_moves,
+            "position_features": {
+                "material_balance": "even",  # Placeholder
+                "king_safety": "good",       # Placeholder
+                "pawn_structure": "solid"    # Placeholder
+            }
+        }
+    
+    def stream_engine_analysis(self, board, depth=20):
+        """
+        Stream engine lines for a position as the search deepens, keeping
+        the engine checked out until the search ends or the stream is closed
+        
+        Args:
+            board (chess.Board): The position
+            depth (int): Analysis depth
+            
+        Yields:
+            dict: Top-move entries with the "depth" and "multipv" rank
+                they were reported at
+        """
+        with self.engine_pool.engine() as engine:
+            with engine.analysis(board, chess.engine.Limit(depth=depth), multipv=TOP_MOVES) as analysis:
+                for info in analysis:
+                    line = _line(info)
+                    if line:
+                        line["depth"] = info.get("depth")
+                        line["multipv"] = info.get("multipv", 1)
+                        yield line
+    
+    @staticmethod
+    def parse_pgn(pgn_text):
         """
         Parse a PGN game and return structured data
         
+        Static so it can be sent to a worker process without the analyzer.
+        
         Args:
             pgn_text (str): PGN text of the game
             
@@ -110,11 +194,11 @@ class ProcessAnalyzer:
             headers = dict(game.headers)
             moves = []
             
-            # Extract moves
+            # Extract moves (san_and_push plays each move once, where san()
+            # then push() would play it twice)
             board = game.board()
             for move in game.mainline_moves():
-                san = board.san(move)
-                board.push(move)
+                san = board.san_and_push(move)
                 moves.append({
                     "san": san,
                     "uci": move.uci(),
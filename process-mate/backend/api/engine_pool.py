@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Process-Mate engine pool
+Keeps a fixed set of Stockfish processes running so requests do not pay
+for starting the engine and the UCI handshake
+"""
+
+import contextlib
+import logging
+import os
+import queue
+import shutil
+from typing import Iterator, List, Optional
+
+import chess.engine
+
+logger = logging.getLogger(__name__)
+
+
+def find_stockfish() -> Optional[str]:
+    """Return the Stockfish binary named by $STOCKFISH_PATH or found on the PATH"""
+    return os.environ.get('STOCKFISH_PATH') or shutil.which('stockfish')
+
+
+class EnginePool:
+    """
+    Long-lived UCI engines handed out to one request at a time.
+
+    An empty pool (no binary, or the engine failed to start) is falsy, so
+    callers can fall back to running without an engine.
+    """
+
+    def __init__(self, path: Optional[str], size: int):
+        """
+        Start the engines
+
+        Args:
+            path (str): Engine binary, or None for an empty pool
+            size (int): Number of engine processes to start
+        """
+        self.path = path
+        self._closed = False
+        self._engines: List[chess.engine.SimpleEngine] = []
+        self._idle: "queue.Queue[chess.engine.SimpleEngine]" = queue.Queue()
+        if path:
+            for _ in range(size):
+                engine = self._start()
+                if engine is None:
+                    break
+                self._idle.put(engine)
+
+    def __len__(self) -> int:
+        return len(self._engines)
+
+    def _start(self) -> Optional[chess.engine.SimpleEngine]:
+        """Start one engine process and add it to the pool"""
+        if self._closed:
+            return None
+        try:
+            engine = chess.engine.SimpleEngine.popen_uci(self.path)
+        except (OSError, chess.engine.EngineError) as e:
+            logger.warning("Could not start engine %s: %s", self.path, e)
+            return None
+        self._engines.append(engine)
+        return engine
+
+    @contextlib.contextmanager
+    def engine(self) -> Iterator[chess.engine.SimpleEngine]:
+        """
+        Check out an idle engine, waiting for one to be returned if all are busy
+
+        An engine that dies while checked out is replaced rather than
+        returned to the pool.
+        """
+        engine = self._idle.get()
+        try:
+            yield engine
+        except chess.engine.EngineTerminatedError:
+            self._engines.remove(engine)
+            engine = self._start()
+            raise
+        finally:
+            if engine is not None:
+                self._idle.put(engine)
+
+    def close(self) -> None:
+        """Quit every engine process; engines that die afterwards are not replaced"""
+        self._closed = True
+        for engine in self._engines:
+            try:
+                engine.quit()
+            except (chess.engine.EngineError, TimeoutError):
+                pass
+        self._engines.clear()
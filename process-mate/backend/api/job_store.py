@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Process-Mate job store
+Keeps the results of background jobs as files in a directory shared by
+every server process, so a job can be polled from any worker
+"""
+
+import contextlib
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+# Job ids are uuid4 hex strings; anything else never names a file
+JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+
+class JobStore:
+    """
+    Background job results on disk.
+
+    A job is "<id>.pending" while it runs and "<id>.<status>.json", holding
+    the response body, once it is done. Results are written under a
+    temporary name and renamed, so a reader never sees a partial file.
+    """
+
+    # HTTP statuses a finished job can have, in the order they are looked up
+    STATUSES = (200, 400, 500)
+
+    # Seconds between sweeps for expired files
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, directory: str, ttl: float, stale_after: float):
+        """
+        Open the store, creating its directory if needed
+
+        Args:
+            directory (str): Directory shared by the server processes
+            ttl (float): Seconds a finished job can still be polled
+            stale_after (float): Seconds after which a job still pending is
+                taken to belong to a worker that died
+        """
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def create(self) -> str:
+        """Register a new pending job and return its id"""
+        self._sweep()
+        job_id = uuid.uuid4().hex
+        open(self._path(job_id, 'pending'), 'wb').close()
+        return job_id
+
+    def finish(self, job_id: str, status: int, body: bytes) -> None:
+        """Store the response body of a finished job"""
+        temporary = self._path(job_id, 'tmp')
+        with open(temporary, 'wb') as f:
+            f.write(body)
+        os.replace(temporary, self._path(job_id, f"{status}.json"))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path(job_id, 'pending'))
+
+    def get(self, job_id: str) -> Optional[Tuple[int, Optional[bytes]]]:
+        """
+        Look up a job
+
+        Returns:
+            tuple: (status, body) for a finished job, (202, None) while it
+                is pending, or None for an unknown or expired job
+        """
+        if not JOB_ID_RE.fullmatch(job_id):
+            return None
+        for status in self.STATUSES:
+            try:
+                with open(self._path(job_id, f"{status}.json"), 'rb') as f:
+                    return status, f.read()
+            except FileNotFoundError:
+                continue
+        if os.path.exists(self._path(job_id, 'pending')):
+            return 202, None
+        return None
+
+    def _sweep(self) -> None:
+        """Delete expired results and stale pending jobs, at most once per SWEEP_INTERVAL"""
+        now = time.time()
+        with self._sweep_lock:
+            if now - self._last_sweep < self.SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                limit = self.stale_after if entry.name.endswith('.pending') else self.ttl
+                # Another process may delete or finish the same job meanwhile
+                with contextlib.suppress(FileNotFoundError):
+                    if now - entry.stat().st_mtime > limit:
+                        os.remove(entry.path)
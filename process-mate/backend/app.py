@@ -4,69 +4,341 @@ Process-Mate Web App Backend
 Flask API that serves as the backend for the process analysis web application
 """
 
+import atexit
+import concurrent.futures
+import json
+import multiprocessing
 import os
-from flask import Flask, request, jsonify
+import re
+import tempfile
+import threading
+from functools import lru_cache
+from flask import Flask, request, g
 from flask_cors import CORS
 import chess
 import chess.engine
 from api.analyzer import ProcessAnalyzer
+from api.engine_pool import EnginePool, find_stockfish
+from api.job_store import JobStore
+
+# Default position of every endpoint, bound once instead of looked up on
+# the chess module per request
+_START_FEN = chess.STARTING_FEN
+
+# orjson is optional; the standard library encoder is the fallback.
+# Either way _dumps returns bytes.
+try:
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+# flask-compress is optional; without it responses are sent uncompressed
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+# Browser origins allowed to call the API, comma separated in $ALLOWED_ORIGINS
+FRONTEND_ORIGINS = frozenset(
+    origin.strip()
+    for origin in os.environ.get('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
+    if origin.strip()
+)
 
 app = Flask(__name__)
-CORS(app)
+# The health check is for load balancers, not browsers, so it gets no CORS headers
+CORS(app, resources={r"/api/(?!health$).*": {"origins": sorted(FRONTEND_ORIGINS)}}, send_wildcard=False)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 512
+if Compress is not None:
+    Compress(app)
+
+# Start the engines once per process rather than once per request. When
+# run as `python app.py`, the PGN workers re-import this file as
+# __mp_main__; they never search, so they get an empty pool.
+ENGINE_POOL = EnginePool(find_stockfish() if __name__ != '__mp_main__' else None,
+                         int(os.environ.get('SF_WORKERS', os.cpu_count() or 1)))
+# Each engine's event loop runs on a non-daemon thread that only ends once
+# the engine quits, and plain atexit hooks run after those threads are
+# joined, so quit the engines from threading's shutdown hook instead
+getattr(threading, '_register_atexit', atexit.register)(ENGINE_POOL.close)
 
 # Initialize the process analyzer
-analyzer = ProcessAnalyzer()
+analyzer = ProcessAnalyzer(ENGINE_POOL)
+
+# PGN parsing is CPU-bound, so it runs in worker processes where a large
+# game neither holds the GIL nor blocks this worker's other requests.
+# The workers are started fresh rather than forked from this process,
+# which is multi-threaded and owns the engines and their exit hooks.
+PGN_POOL = concurrent.futures.ProcessPoolExecutor(
+    max_workers=os.cpu_count(),
+    mp_context=multiprocessing.get_context(
+        'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'))
+PGN_TIMEOUT = 30  # seconds
+
+# Engine searches run in the background: POST /api/engine-analysis answers
+# 202 with a job id, and the result is polled from /api/engine-analysis/<id>.
+# Results go to a directory shared by all server processes, so any worker
+# can answer the poll.
+ENGINE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=len(ENGINE_POOL) or 1)
+JOB_TTL = 300  # seconds a finished job can still be polled
+JOB_STORE = JobStore(os.environ.get('JOBS_DIR') or os.path.join(tempfile.gettempdir(), 'process-mate-jobs'),
+                     ttl=JOB_TTL, stale_after=3600)
+# Searches this process has waiting for or holding an engine; more are
+# refused with 503
+MAX_PENDING_JOBS = 4 * (len(ENGINE_POOL) or 1)
+_pending_jobs = set()
+_pending_lock = threading.Lock()
+
+# Results kept per process; both analyses are pure functions of their input
+ENGINE_CACHE_SIZE = 100_000
+ANALYSIS_CACHE_SIZE = 4096
+
+# Shape of a FEN: eight ranks, side to move, castling, en passant and clocks.
+# Matching it rejects garbage cheaply; chess.Board still checks the position.
+FEN_RE = re.compile(r'([rnbqkpRNBQKP1-8]+/){7}[rnbqkpRNBQKP1-8]+ [wb] (-|[KQkq]+) (-|[a-h][36]) \d+ \d+')
+
+def is_fen(fen):
+    """Check that a request value looks like a FEN before parsing it"""
+    return isinstance(fen, str) and FEN_RE.fullmatch(fen) is not None
+
+def invalid_fen():
+    """Response for a request whose FEN failed is_fen()"""
+    return json_response({"error": "invalid fen"}, 400)
+
+# Deepest search a request may ask for; deeper searches hold an engine for minutes
+MAX_DEPTH = 30
+
+def is_depth(depth):
+    """Check that a request value is a usable search depth"""
+    return isinstance(depth, int) and not isinstance(depth, bool) and 1 <= depth <= MAX_DEPTH
+
+def invalid_depth():
+    """Response for a request whose depth failed is_depth()"""
+    return json_response({"error": f"depth must be an integer from 1 to {MAX_DEPTH}"}, 400)
+
+# Parsed once; most requests without a FEN copy it instead of parsing one
+_START = chess.Board(_START_FEN)
+
+def board_from_fen(fen):
+    """Board for a FEN that passed is_fen()"""
+    return _START.copy(stack=False) if fen == _START_FEN else chess.Board(fen)
+
+def position_key(fen):
+    """
+    Strip the halfmove and fullmove clocks from a FEN, so transpositions
+    reached at different move numbers share a cache entry
+    """
+    return ' '.join(fen.split()[:4])
+
+@lru_cache(maxsize=ENGINE_CACHE_SIZE)
+def cached_engine_analysis(pos_key, depth):
+    """Engine analysis of a position key from position_key()"""
+    return analyzer.get_engine_analysis(board_from_fen(pos_key + ' 0 1'), depth)
+
+# A move in UCI form; anything else is treated as SAN
+UCI_RE = re.compile(r'[a-h][1-8][a-h][1-8][qrbn]?')
+MOVE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=MOVE_CACHE_SIZE)
+def uci_move(uci):
+    """Parse a UCI move; the same few thousand strings recur all session"""
+    return chess.Move.from_uci(uci)
+
+def parse_move(board, text):
+    """
+    Resolve a move sent in UCI or SAN (which the frontend sends) in a position.
+    Raises ValueError if it is not a legal move there.
+    """
+    if not UCI_RE.fullmatch(text):
+        return board.parse_san(text)
+    move = uci_move(text)
+    if not board.is_legal(move):
+        raise ValueError(f"illegal uci: {text!r} in {board.fen()}")
+    return move
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def cached_position_analysis(fen, move):
+    """
+    Thought-process analysis of a position and move; keyed on the full FEN
+    since the result echoes it back
+    """
+    board = board_from_fen(fen)
+    return analyzer.analyze_position(board, parse_move(board, move) if move else None, fen=fen)
+
+@app.before_request
+def load_payload():
+    """
+    Decode a JSON request body once into g.payload; a missing, non-JSON or
+    malformed body leaves it empty so the endpoints fall back to their defaults
+    """
+    g.payload = {}
+    if request.method == 'POST' and request.is_json:
+        try:
+            payload = _loads(request.get_data(cache=False))
+        except ValueError:
+            return
+        if isinstance(payload, dict):
+            g.payload = payload
+
+def json_response(obj, status=200):
+    """Encode obj as a JSON response"""
+    return app.response_class(_dumps(obj), status=status, mimetype='application/json')
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_position():
     """
     Analyze a chess position and return insights on the thought process
     """
-    data = request.json
-    fen = data.get('fen', chess.STARTING_FEN)
+    data = g.payload
+    fen = data.get('fen', _START_FEN)
     move = data.get('move')
+    if not is_fen(fen):
+        return invalid_fen()
+    if move is not None and not isinstance(move, str):
+        return json_response({"error": "move must be a string"}, 400)
     
     # PLACEHOLDER: This function will be implemented by the user
     # It should analyze the position and the thought process behind a move
-    result = analyzer.analyze_position(fen, move)
+    try:
+        result = cached_position_analysis(fen, move)
+    except ValueError as e:
+        # An illegal move, or a FEN that is well formed but not a position
+        return json_response({"error": str(e)}, 400)
     
-    return jsonify(result)
+    return json_response(result)
 
 @app.route('/api/engine-analysis', methods=['POST'])
 def get_engine_analysis():
     """
     Get engine analysis for a given position
     """
-    data = request.json
-    fen = data.get('fen', chess.STARTING_FEN)
+    data = g.payload
+    fen = data.get('fen', _START_FEN)
     depth = data.get('depth', 20)
+    if not is_fen(fen):
+        return invalid_fen()
+    if not is_depth(depth):
+        return invalid_depth()
     
     # PLACEHOLDER: This function will be implemented by the user
     # It should return Stockfish analysis for the position
-    result = analyzer.get_engine_analysis(fen, depth)
+    with _pending_lock:
+        if len(_pending_jobs) >= MAX_PENDING_JOBS:
+            return json_response({"error": "Too many pending analyses"}, 503)
+        job_id = JOB_STORE.create()
+        future = ENGINE_EXECUTOR.submit(run_engine_job, job_id, position_key(fen), depth)
+        _pending_jobs.add(future)
+    future.add_done_callback(finish_pending)
+    
+    return json_response({"job_id": job_id}, 202)
+
+def run_engine_job(job_id, pos_key, depth):
+    """Run a search for POST /api/engine-analysis and store its response"""
+    try:
+        status, body = 200, cached_engine_analysis(pos_key, depth)
+    except ValueError as e:
+        # A FEN that is well formed but not a position
+        status, body = 400, {"error": str(e)}
+    except Exception:
+        # Anything else still has to finish the job, or it stays pending
+        app.logger.exception("Engine analysis job %s failed", job_id)
+        status, body = 500, {"error": "Engine analysis failed"}
+    JOB_STORE.finish(job_id, status, _dumps(body))
+
+def finish_pending(future):
+    """Stop counting a finished job against MAX_PENDING_JOBS"""
+    with _pending_lock:
+        _pending_jobs.discard(future)
+
+@app.route('/api/engine-analysis/<job_id>', methods=['GET'])
+def get_engine_analysis_result(job_id):
+    """
+    Poll an engine analysis job: 200 with the result once it is done,
+    202 while the search runs and 404 for an unknown or expired job
+    """
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        return json_response({"error": "unknown job"}, 404)
+    status, body = job
+    if body is None:
+        return json_response({"status": "pending"}, status)
+    
+    return app.response_class(body, status=status, mimetype='application/json')
+
+@app.route('/api/engine-analysis/stream', methods=['GET'])
+def stream_engine_analysis():
+    """
+    Stream engine analysis for a position as Server-Sent Events, one event
+    per line as the search deepens and a final "done" event
+    
+    A GET with query parameters, since that is what EventSource sends.
+    """
+    fen = request.args.get('fen', _START_FEN)
+    try:
+        depth = int(request.args.get('depth', 20))
+    except ValueError:
+        return invalid_depth()
+    if not is_fen(fen):
+        return invalid_fen()
+    if not is_depth(depth):
+        return invalid_depth()
+    if not ENGINE_POOL:
+        return json_response({"error": "No engine available"}, 503)
+    # Parsed here so an invalid position fails before the stream starts
+    try:
+        board = board_from_fen(fen)
+    except ValueError as e:
+        # A FEN that is well formed but not a position
+        return json_response({"error": str(e)}, 400)
+    lines = analyzer.stream_engine_analysis(board, depth)
+    
+    def events():
+        for line in lines:
+            yield b"data: " + _dumps(line) + b"\n\n"
+        yield b"event: done\ndata: {}\n\n"
     
-    return jsonify(result)
+    return app.response_class(events(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache'})
 
 @app.route('/api/validate-pgn', methods=['POST'])
 def validate_pgn():
     """
     Validate and parse a PGN game
     """
-    data = request.json
+    data = g.payload
     pgn_text = data.get('pgn', '')
     
     # PLACEHOLDER: This function will be implemented by the user
     # It should validate the PGN and return the game data
-    result = analyzer.parse_pgn(pgn_text)
+    result = PGN_POOL.submit(ProcessAnalyzer.parse_pgn, pgn_text).result(timeout=PGN_TIMEOUT)
     
-    return jsonify(result)
+    return json_response(result)
+
+@app.errorhandler(concurrent.futures.TimeoutError)
+def handle_timeout(error):
+    """
+    Report work that did not finish in time
+    """
+    return json_response({"error": "Request timed out"}, 504)
+
+# Built once and returned as is. It is excluded from CORS, so no hook adds
+# per-request headers to it; flask-compress only sets the same Vary header.
+_HEALTH = app.response_class(b'{"status":"ok"}', mimetype='application/json',
+                             headers={'Cache-Control': 'no-store'})
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """
     Simple health check endpoint
     """
-    return jsonify({"status": "ok"})
+    return _HEALTH
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
+    # Development server only; production runs `gunicorn wsgi:application`.
+    # Set DEV=1 for the debugger and the auto-reloader.
+    app.run(debug=bool(os.environ.get('DEV')), host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
@@ -0,0 +1,18 @@
+"""
+Gunicorn settings for the Process-Mate backend
+Loaded automatically by `gunicorn wsgi:application` run from this directory
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Threaded workers, so a request blocked on the engine does not hold up
+# the other endpoints served by the same process. Engine jobs can be
+# polled from any worker, since their results are kept in $JOBS_DIR.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+threads = 4
+
+# Every worker starts its own engines; one each keeps one engine per core
+os.environ.setdefault("SF_WORKERS", "1")
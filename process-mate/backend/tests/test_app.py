@@ -0,0 +1,164 @@
+"""Tests for the Flask endpoints in app."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import chess
+
+# Configure before importing app: no engines, and a private job directory
+os.environ['SF_WORKERS'] = '0'
+JOBS_DIR = tempfile.mkdtemp(prefix='process-mate-jobs-')
+os.environ['JOBS_DIR'] = JOBS_DIR
+
+import app  # noqa: E402
+
+
+def tearDownModule():
+    shutil.rmtree(JOBS_DIR, ignore_errors=True)
+
+
+# Matches FEN_RE but is not a position: "88" is two adjacent digits
+MALFORMED_POSITION = "rnbqkbnr/pppppppp/88/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class AppTestCase(unittest.TestCase):
+    """Runs each test against a fresh client and empty caches."""
+
+    def setUp(self):
+        self.assertFalse(app.ENGINE_POOL)
+        app.cached_engine_analysis.cache_clear()
+        app.cached_position_analysis.cache_clear()
+        self.client = app.app.test_client()
+
+
+class IsFenTest(unittest.TestCase):
+    """is_fen accepts well-formed FENs only."""
+
+    def test_positions_from_play(self):
+        board = chess.Board()
+        for san in ["e4", "c5", "Nf3", "d6", "d4", "cxd4", "Nxd4"]:
+            board.push_san(san)
+            self.assertTrue(app.is_fen(board.fen()), board.fen())
+
+    def test_rejects(self):
+        for fen in ["garbage", 123, None, chess.STARTING_FEN + "\n",
+                    chess.STARTING_FEN.rsplit(" ", 2)[0],
+                    chess.STARTING_FEN.replace(" w ", " x ")]:
+            self.assertFalse(app.is_fen(fen), repr(fen))
+
+
+class FenValidationTest(AppTestCase):
+    """Endpoints answer 400 for FENs that are not positions."""
+
+    def test_malformed_fen(self):
+        self.assertEqual(self.client.post('/api/analyze', json={'fen': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/engine-analysis', json={'fen': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/engine-analysis/stream', query_string={'fen': 'garbage'}).status_code, 400)
+
+    def test_well_formed_fen_that_is_not_a_position(self):
+        response = self.client.post('/api/analyze', json={'fen': MALFORMED_POSITION})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json)
+
+    def test_fen_is_echoed(self):
+        # python-chess drops this en passant square, the echo must not
+        fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+        response = self.client.post('/api/analyze', json={'fen': fen})
+        self.assertEqual(response.json['position']['fen'], fen)
+
+
+class LoadPayloadTest(AppTestCase):
+    """Bodies that are not a JSON object fall back to the defaults."""
+
+    def assert_default_position(self, **kwargs):
+        response = self.client.post('/api/analyze', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['position']['fen'], chess.STARTING_FEN)
+
+    def test_no_body(self):
+        self.assert_default_position()
+
+    def test_malformed_json(self):
+        self.assert_default_position(data='{"fen": ', content_type='application/json')
+
+    def test_not_json(self):
+        self.assert_default_position(data='fen=x', content_type='text/plain')
+
+    def test_not_an_object(self):
+        self.assert_default_position(json=["fen"])
+
+
+class ParseMoveTest(unittest.TestCase):
+    """parse_move resolves UCI and SAN and rejects illegal moves."""
+
+    def setUp(self):
+        self.board = chess.Board()
+
+    def test_uci(self):
+        self.assertEqual(app.parse_move(self.board, "g1f3"), chess.Move.from_uci("g1f3"))
+
+    def test_san(self):
+        self.assertEqual(app.parse_move(self.board, "Nf3"), chess.Move.from_uci("g1f3"))
+
+    def test_illegal(self):
+        for text in ["e2e5", "Ke2", "zz"]:
+            with self.assertRaises(ValueError, msg=text):
+                app.parse_move(self.board, text)
+
+    def test_endpoint_reports_san(self):
+        client = app.app.test_client()
+        response = client.post('/api/analyze', json={'move': 'e2e4'})
+        self.assertEqual(response.json['move_analysis']['move'], "e4")
+        self.assertEqual(client.post('/api/analyze', json={'move': 'e2e5'}).status_code, 400)
+        self.assertEqual(client.post('/api/analyze', json={'move': 5}).status_code, 400)
+
+
+class EngineJobTest(AppTestCase):
+    """POST answers 202 with a job id that is polled for the result."""
+
+    def poll(self, job_id):
+        deadline = time.monotonic() + 10
+        while True:
+            response = self.client.get(f'/api/engine-analysis/{job_id}')
+            if response.status_code != 202 or time.monotonic() > deadline:
+                return response
+            time.sleep(0.01)
+
+    def test_job_result(self):
+        response = self.client.post('/api/engine-analysis', json={'depth': 5})
+        self.assertEqual(response.status_code, 202)
+        result = self.poll(response.json['job_id'])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json['depth'], 5)
+
+    def test_job_for_invalid_position(self):
+        response = self.client.post('/api/engine-analysis', json={'fen': MALFORMED_POSITION})
+        self.assertEqual(self.poll(response.json['job_id']).status_code, 400)
+
+    def test_unknown_job(self):
+        for job_id in ["0" * 32, "not-a-job", ".."]:
+            self.assertEqual(self.client.get(f'/api/engine-analysis/{job_id}').status_code, 404)
+
+    def test_invalid_depth(self):
+        for depth in [0, -5, app.MAX_DEPTH + 1, True, "20", None]:
+            response = self.client.post('/api/engine-analysis', json={'depth': depth})
+            self.assertEqual(response.status_code, 400, repr(depth))
+
+
+class HealthTest(AppTestCase):
+    """The health check is a fixed, uncached, CORS-free response."""
+
+    def test_headers(self):
+        response = self.client.get('/api/health', headers={'Origin': 'http://localhost:3000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"status": "ok"})
+        self.assertEqual(response.headers['Content-Type'], 'application/json')
+        self.assertEqual(response.headers['Cache-Control'], 'no-store')
+        self.assertNotIn('Access-Control-Allow-Origin', response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
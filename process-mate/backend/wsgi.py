@@ -0,0 +1,8 @@
+"""
+Process-Mate WSGI entry point
+Exposes the Flask app to production servers such as gunicorn
+"""
+
+from app import app
+
+application = app
@@ -2,6 +2,9 @@ import axios from 'axios';
 
 const API_BASE_URL = '/api';
 
+// Milliseconds between polls for a running engine analysis job
+const ENGINE_POLL_INTERVAL = 250;
+
 // API client instance
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -36,14 +39,42 @@ export const fetchAnalysis = async (fen, move) => {
  */
 export const fetchEngineAnalysis = async (fen, depth = 20) => {
   try {
-    const response = await apiClient.post('/engine-analysis', { fen, depth });
-    return response.data;
+    // The search runs as a background job; poll until it answers 200
+    const { data: { job_id: jobId } } = await apiClient.post('/engine-analysis', { fen, depth });
+    for (;;) {
+      const response = await apiClient.get(`/engine-analysis/${jobId}`);
+      if (response.status === 200) {
+        return response.data;
+      }
+      await new Promise((resolve) => setTimeout(resolve, ENGINE_POLL_INTERVAL));
+    }
   } catch (error) {
     console.error('Error fetching engine analysis:', error);
     throw error;
   }
 };
 
+/**
+ * Stream engine analysis for a position as the search deepens
+ * 
+ * @param {string} fen - FEN notation of the position
+ * @param {number} depth - Analysis depth (optional)
+ * @param {Function} onLine - Called with each line ({move, eval, lines, depth, multipv})
+ * @returns {EventSource} - Close it to stop the search early
+ */
+export const streamEngineAnalysis = (fen, depth = 20, onLine) => {
+  const params = new URLSearchParams({ fen, depth });
+  const source = new EventSource(`${API_BASE_URL}/engine-analysis/stream?${params}`);
+  source.onmessage = (event) => onLine(JSON.parse(event.data));
+  // Close on completion; otherwise EventSource reconnects and searches again
+  source.addEventListener('done', () => source.close());
+  source.onerror = (error) => {
+    console.error('Error streaming engine analysis:', error);
+    source.close();
+  };
+  return source;
+};
+
 /**
  * Validate and parse a PGN game
  * 
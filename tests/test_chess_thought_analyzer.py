@@ -0,0 +1,151 @@
+"""Tests for the static analysis in chess_thought_analyzer."""
+
+import random
+import unittest
+
+import chess
+
+import chess_thought_analyzer as cta
+
+
+def random_game_positions(games, seed=1234, max_moves=150):
+    """
+    Yield every position of random games played from the starting position.
+
+    Each game lasts 1 to max_moves plies, so this yields about
+    games * max_moves / 2 positions.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(rng.randint(1, max_moves)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+            yield board.copy()
+
+
+class MayGiveCheckTest(unittest.TestCase):
+    """_may_give_check must never reject a move that gives check."""
+
+    def assert_superset(self, board):
+        king = board.king(not board.turn)
+        for move in board.legal_moves:
+            if board.gives_check(move):
+                self.assertTrue(cta._may_give_check(board, move, king),
+                                f"{move.uci()} gives check in {board.fen()}")
+
+    def test_random_positions(self):
+        for board in random_game_positions(games=20):
+            self.assert_superset(board)
+
+    def test_en_passant_discovered_check(self):
+        # Capturing en passant uncovers the rook on the fifth rank
+        board = chess.Board("8/8/8/R2Pp2k/8/8/8/4K3 w - e6 0 1")
+        move = chess.Move.from_uci("d5e6")
+        self.assertTrue(board.gives_check(move))
+        self.assert_superset(board)
+
+    def test_castling_check(self):
+        board = chess.Board("5k2/8/8/8/8/8/8/4K2R w K - 0 1")
+        self.assertTrue(board.gives_check(chess.Move.from_uci("e1g1")))
+        self.assert_superset(board)
+
+    def test_promotion_check(self):
+        board = chess.Board("7k/1P6/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertTrue(board.gives_check(chess.Move.from_uci("b7b8q")))
+        self.assert_superset(board)
+
+
+class AnyCaptureTest(unittest.TestCase):
+    """_any_capture must agree with scanning the legal moves."""
+
+    def test_random_positions(self):
+        for board in random_game_positions(games=20):
+            expected = any(board.is_capture(move) for move in board.legal_moves)
+            self.assertEqual(cta._any_capture(board), expected, board.fen())
+
+    def test_pinned_attacker(self):
+        # The knight attacks the rook but is pinned against its king
+        board = chess.Board("4k3/8/8/8/4r3/2n5/4N3/4K3 w - - 0 1")
+        self.assertFalse(cta._any_capture(board))
+
+    def test_en_passant(self):
+        board = chess.Board("4k3/8/8/3Pp3/8/8/8/4K3 w - e6 0 1")
+        self.assertTrue(cta._any_capture(board))
+
+
+class FindThreatsTest(unittest.TestCase):
+    """Threats reported by find_threats."""
+
+    def test_undefended_piece_is_hanging(self):
+        board = chess.Board("4k3/8/2b5/8/N7/8/8/4K3 w - - 0 1")
+        threats = cta.PositionAnalysis(board).find_threats()
+        self.assertEqual([(threat.kind, threat.square) for threat in threats],
+                         [("hanging", chess.A4)])
+
+    def test_tactic_leaving_our_piece_hanging_is_skipped(self):
+        # Bxf7+ wins the rook on a8 after any reply, but Kxf7 wins the bishop
+        board = chess.Board("rr4k1/5p2/8/8/2B5/8/8/R6K w - - 0 1")
+        threats = cta.PositionAnalysis(board).find_threats()
+        texts = [threat.text for threat in threats if threat.kind == "material"]
+        self.assertNotIn("Potential winning tactic starting with Bxf7+", texts)
+
+
+class FindTacticalSignalsTest(unittest.TestCase):
+    """Signals reported by find_tactical_signals."""
+
+    def test_defender_on_a1_counts(self):
+        # The rook on a1 (square 0) defends the bishop
+        board = chess.Board("4k3/8/8/8/b7/7K/8/r7 w - - 0 1")
+        signals = cta.PositionAnalysis(board).find_tactical_signals()
+        self.assertNotIn("Undefended Bishop on a4", signals)
+
+    def test_undefended_piece(self):
+        board = chess.Board("4k3/8/8/8/b7/7K/8/8 w - - 0 1")
+        signals = cta.PositionAnalysis(board).find_tactical_signals()
+        self.assertIn("Undefended Bishop on a4", signals)
+
+
+class ThoughtProcessTest(unittest.TestCase):
+    """Output of compose_thought_process."""
+
+    def test_threat_creating_moves_are_listed(self):
+        board = chess.Board("4k3/8/8/3r4/8/8/8/1N2K3 b - - 0 1")
+        board.push_san("Ke7")
+        output, _ = cta.PositionAnalysis(board).compose_thought_process(False, None)
+        text = "".join(segment for segment, _ in output)
+        self.assertIn("Moves creating threats:\n• Nc3\n", text)
+
+
+class EvalCacheTest(unittest.TestCase):
+    """Cached evaluations are reused by the depth the search reached."""
+
+    def setUp(self):
+        # The cache needs none of the Tk UI
+        self.analyzer = cta.ChessThoughtAnalyzer.__new__(cta.ChessThoughtAnalyzer)
+        self.analyzer._eval_cache = cta.OrderedDict()
+
+    def test_time_capped_search(self):
+        # Stopped by the time cap at depth 10 of the limit's 16
+        info = {"depth": 10}
+        self.analyzer._store_eval("key", cta.CANDIDATE_LIMIT, info)
+        self.assertIs(self.analyzer._cached_eval("key", cta.CANDIDATE_LIMIT), info)
+        self.assertIsNone(self.analyzer._cached_eval("key", cta.GAME_MOVE_LIMIT))
+
+    def test_deep_enough_search(self):
+        info = {"depth": 16}
+        self.analyzer._store_eval("key", cta.CANDIDATE_LIMIT, info)
+        self.assertIs(self.analyzer._cached_eval("key", cta.GAME_MOVE_LIMIT), info)
+        self.assertIsNone(self.analyzer._cached_eval("key", cta.POSITION_LIMIT))
+
+    def test_shallower_search_is_not_stored(self):
+        info = {"depth": 16}
+        self.analyzer._store_eval("key", cta.CANDIDATE_LIMIT, info)
+        self.analyzer._store_eval("key", cta.FALLBACK_CANDIDATE_LIMIT, {"depth": 12})
+        self.assertIs(self.analyzer._cached_eval("key", cta.CANDIDATE_LIMIT), info)
+
+
+if __name__ == "__main__":
+    unittest.main()